@@ -0,0 +1,187 @@
+"""Response cache for read endpoints, shared by all workers through a local SQLite file.
+
+Entries are keyed by route, query params, role and the current generation of every
+data scope the route reads. crud bumps a scope's generation after each write, so
+entries from older generations are never looked up again and age out of the LRU.
+Task listings are scoped per project, so a write only cools its own board.
+
+Hits stay read-only where possible: hit/miss counts are kept per process and flushed
+periodically, and ``last_used`` is only refreshed once it is older than a threshold.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+from .config import settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS generations (scope TEXT PRIMARY KEY, gen INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_entries_last_used ON entries (last_used);
+CREATE TABLE IF NOT EXISTS stats (
+    route TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# Seconds between refreshes of an entry's last_used, and between flushes of the counters.
+TOUCH_SECONDS = 30.0
+FLUSH_SECONDS = 10.0
+
+logger = logging.getLogger(__name__)
+_local = threading.local()
+_lock = threading.Lock()
+_pending: Dict[str, List[int]] = {}
+_last_flush = 0.0
+
+
+def _conn() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(settings.CACHE_PATH, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def enabled(route: str) -> bool:
+    disabled = {r.strip() for r in settings.CACHE_DISABLED_ROUTES.split(",") if r.strip()}
+    return settings.CACHE_ENABLED and route not in disabled
+
+
+def _write(conn: sqlite3.Connection, *statements) -> None:
+    """Run ``(sql, params)`` statements in one write transaction, flushing pending counters with them."""
+    global _last_flush
+    with _lock:
+        counts = dict(_pending)
+        _pending.clear()
+        _last_flush = time.time()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for sql, params in statements:
+            conn.execute(sql, params)
+        conn.executemany(
+            "INSERT INTO stats (route, hits, misses) VALUES (?, ?, ?) "
+            "ON CONFLICT(route) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses",
+            [(route, hits, misses) for route, (hits, misses) in counts.items()],
+        )
+        conn.execute("COMMIT")
+    except sqlite3.Error:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        with _lock:
+            for route, (hits, misses) in counts.items():
+                tally = _pending.setdefault(route, [0, 0])
+                tally[0] += hits
+                tally[1] += misses
+        raise
+
+
+def _tally(route: str, hit: bool) -> bool:
+    """Count a lookup in this process; returns True when the counters are due for a flush."""
+    with _lock:
+        _pending.setdefault(route, [0, 0])[0 if hit else 1] += 1
+        return time.time() - _last_flush > FLUSH_SECONDS
+
+
+def task_scope(project_id: Optional[int]) -> str:
+    """Scope of a task listing: one per project, plus "tasks" for unfiltered listings."""
+    return f"tasks:{project_id}" if project_id else "tasks"
+
+
+def invalidate(*scopes: str) -> None:
+    if not settings.CACHE_ENABLED:
+        return
+    try:
+        _conn().executemany(
+            "INSERT INTO generations (scope, gen) VALUES (?, 1) ON CONFLICT(scope) DO UPDATE SET gen = gen + 1",
+            [(s,) for s in scopes],
+        )
+    except sqlite3.Error:
+        # The write already committed; failing the request would only invite duplicate retries.
+        # Stale entries for these scopes expire after CACHE_TTL_SECONDS.
+        logger.warning("Could not invalidate cache scopes %s", scopes, exc_info=True)
+
+
+def _evictions(now: float) -> list:
+    return [
+        ("DELETE FROM entries WHERE created_at <= ?", (now - settings.CACHE_TTL_SECONDS,)),
+        # Drop least recently used entries once the running total exceeds the byte budget.
+        ("DELETE FROM entries WHERE key IN ("
+         "  SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY last_used DESC, rowid DESC) AS running"
+         "  FROM entries) WHERE running > ?)", (settings.CACHE_MAX_BYTES,)),
+    ]
+
+
+def get_or_set(route: str, params: Dict[str, object], role: str, scopes: Sequence[str],
+               render: Callable[[], bytes]) -> bytes:
+    """Return the cached body for this request, or render, store and return it.
+
+    The cache never fails a read: any SQLite error falls back to rendering.
+    """
+    if not enabled(route):
+        return render()
+    try:
+        conn = _conn()
+        placeholders = ",".join("?" * len(scopes))
+        gens = dict(conn.execute(f"SELECT scope, gen FROM generations WHERE scope IN ({placeholders})", scopes))
+        key = json.dumps([route, sorted(params.items()), role, [gens.get(s, 0) for s in scopes]], default=str)
+        now = time.time()
+        row = conn.execute("SELECT body, last_used FROM entries WHERE key = ? AND created_at > ?",
+                           (key, now - settings.CACHE_TTL_SECONDS)).fetchone()
+    except sqlite3.Error:
+        return render()
+
+    if row:
+        body, last_used = row
+        flush_due = _tally(route, hit=True)
+        if now - last_used > TOUCH_SECONDS or flush_due:
+            try:
+                _write(conn, ("UPDATE entries SET last_used = ? WHERE key = ?", (now, key)))
+            except sqlite3.Error:
+                pass
+        return body
+
+    body = render()
+    _tally(route, hit=False)
+    try:
+        _write(conn,
+               ("INSERT OR REPLACE INTO entries (key, body, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, body, len(body), now, now)),
+               *_evictions(now))
+    except sqlite3.Error:
+        pass
+    return body
+
+
+def stats() -> dict:
+    try:
+        conn = _conn()
+        _write(conn)
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        rows = conn.execute("SELECT route, hits, misses FROM stats ORDER BY route").fetchall()
+    except sqlite3.Error:
+        logger.warning("Could not read cache stats", exc_info=True)
+        return {"enabled": settings.CACHE_ENABLED, "available": False, "entries": 0, "bytes": 0, "routes": []}
+    routes: List[dict] = []
+    for route, hits, misses in rows:
+        total = hits + misses
+        routes.append({
+            "route": route,
+            "enabled": enabled(route),
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 4) if total else 0.0,
+        })
+    return {"enabled": settings.CACHE_ENABLED, "available": True, "entries": entries, "bytes": size, "routes": routes}
@@ -7,6 +7,11 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 30
     CORS_ORIGINS: str = "http://localhost:5173"
+    CACHE_ENABLED: bool = True
+    CACHE_PATH: str = "./response_cache.db"
+    CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    CACHE_TTL_SECONDS: int = 300
+    CACHE_DISABLED_ROUTES: str = ""
 
     class Config:
         env_file = ".env"
@@ -1,6 +1,39 @@
+from sqlalchemy import func, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 from typing import Optional, List
-from . import models, schemas, security
+from datetime import date, datetime, timedelta
+import math
+from . import models, schemas, security, cache
+
+
+# Clients that send no version get last-write-wins: a lost race is re-read and retried, and the
+# last attempt locks the row first so it cannot lose again.
+BLIND_UPDATE_ATTEMPTS = 3
+
+
+class VersionConflict(Exception):
+    """Raised when an update targets a version that is no longer current."""
+
+
+def _versioned_update(db: Session, model, pk: int, version: int, values: dict) -> None:
+    # Single conditional UPDATE: only applies if nobody bumped the version since it was read.
+    result = db.execute(
+        update(model)
+        .where(model.id == pk, model.version == version)
+        .values(**values, version=model.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        db.rollback()
+        raise VersionConflict()
+
+
+def _lock_row(db: Session, model, pk: int) -> None:
+    # A no-op UPDATE holds the row (the whole database on SQLite) until commit,
+    # so the read that follows cannot be overtaken by another writer.
+    db.execute(update(model).where(model.id == pk).values(version=model.version)
+               .execution_options(synchronize_session=False))
 
 
 def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
@@ -45,16 +78,28 @@ def create_project(db: Session, data: schemas.ProjectCreate) -> models.Project:
     obj = models.Project(**data.model_dump())
     db.add(obj)
     db.commit()
+    cache.invalidate("projects")
     db.refresh(obj)
     return obj
 
 
 def update_project(db: Session, pid: int, data: schemas.ProjectUpdate) -> Optional[models.Project]:
-    obj = db.query(models.Project).get(pid)
-    if not obj: return None
-    for k, v in data.model_dump().items():
-        setattr(obj, k, v)
+    values = data.model_dump(exclude={"version"})
+    for attempt in range(BLIND_UPDATE_ATTEMPTS):
+        if data.version is None and attempt == BLIND_UPDATE_ATTEMPTS - 1:
+            _lock_row(db, models.Project, pid)
+        obj = db.query(models.Project).get(pid)
+        if not obj: return None
+        if data.version is not None and data.version != obj.version:
+            raise VersionConflict()
+        try:
+            _versioned_update(db, models.Project, pid, obj.version, values)
+            break
+        except VersionConflict:
+            if data.version is not None or attempt == BLIND_UPDATE_ATTEMPTS - 1:
+                raise
     db.commit()
+    cache.invalidate("projects")
     db.refresh(obj)
     return obj
 
@@ -62,8 +107,12 @@ def update_project(db: Session, pid: int, data: schemas.ProjectUpdate) -> Option
 def delete_project(db: Session, pid: int) -> bool:
     obj = db.query(models.Project).get(pid)
     if not obj: return False
+    # Bulk-delete history in SQL; loading it through an ORM cascade would not scale.
+    db.query(models.TaskTransition).filter_by(project_id=pid).delete(synchronize_session=False)
+    db.query(models.ProjectDailySnapshot).filter_by(project_id=pid).delete(synchronize_session=False)
     db.delete(obj)
     db.commit()
+    cache.invalidate("projects", "tasks", cache.task_scope(pid))
     return True
 
 
@@ -78,18 +127,43 @@ def list_tasks(db: Session, status: Optional[models.TaskStatus] = None, project_
 
 def create_task(db: Session, owner_id: int, data: schemas.TaskCreate) -> models.Task:
     obj = models.Task(**data.model_dump(), owner_id=owner_id)
+    now = datetime.utcnow()
+    _open_snapshot(db, obj.project_id, now.date())
     db.add(obj)
+    db.flush()
+    _record_transition(db, obj, None, obj.status, now)
+    project_id = obj.project_id
     db.commit()
+    cache.invalidate("tasks", cache.task_scope(project_id))
     db.refresh(obj)
     return obj
 
 
 def update_task(db: Session, tid: int, data: schemas.TaskUpdate) -> Optional[models.Task]:
-    obj = db.query(models.Task).get(tid)
-    if not obj: return None
-    for k, v in data.model_dump(exclude_none=True).items():
-        setattr(obj, k, v)
+    values = data.model_dump(exclude_none=True, exclude={"version"})
+    for attempt in range(BLIND_UPDATE_ATTEMPTS):
+        if data.version is None and attempt == BLIND_UPDATE_ATTEMPTS - 1:
+            _lock_row(db, models.Task, tid)
+        obj = db.query(models.Task).get(tid)
+        if not obj: return None
+        if data.version is not None and data.version != obj.version:
+            raise VersionConflict()
+        # Re-read on every attempt so the transition log sees the status this update replaced.
+        old_status, new_status = obj.status, values.get("status", obj.status)
+        now = datetime.utcnow()
+        if new_status != old_status:
+            _open_snapshot(db, obj.project_id, now.date())
+        try:
+            _versioned_update(db, models.Task, tid, obj.version, values)
+            break
+        except VersionConflict:
+            if data.version is not None or attempt == BLIND_UPDATE_ATTEMPTS - 1:
+                raise
+    if new_status != old_status:
+        _record_transition(db, obj, old_status, new_status, now)
+    project_id = obj.project_id
     db.commit()
+    cache.invalidate("tasks", cache.task_scope(project_id))
     db.refresh(obj)
     return obj
 
@@ -97,6 +171,122 @@ def update_task(db: Session, tid: int, data: schemas.TaskUpdate) -> Optional[mod
 def delete_task(db: Session, tid: int) -> bool:
     obj = db.query(models.Task).get(tid)
     if not obj: return False
+    today = datetime.utcnow().date()
+    _open_snapshot(db, obj.project_id, today)
+    _shift_snapshot(db, obj.project_id, today, obj.status, None)
+    project_id = obj.project_id
     db.delete(obj)
     db.commit()
+    cache.invalidate("tasks", cache.task_scope(project_id))
     return True
+
+
+# ---- Status history & analytics ----
+def _task_counts(db: Session, project_id: int) -> dict:
+    counts = {s.value: 0 for s in models.TaskStatus}
+    rows = (db.query(models.Task.status, func.count(models.Task.id))
+            .filter(models.Task.project_id == project_id)
+            .group_by(models.Task.status).all())
+    counts.update({st.value: n for st, n in rows})
+    return counts
+
+
+def _open_snapshot(db: Session, project_id: Optional[int], day: date) -> None:
+    """Ensure `project_id` has a snapshot row for `day`, carrying the previous counts forward.
+
+    Must run before the task change is applied: the very first snapshot of a project
+    is seeded from the tasks currently stored.
+    """
+    if project_id is None:
+        return
+    Snap = models.ProjectDailySnapshot
+    if db.query(Snap).get((project_id, day)):
+        return
+    prev = db.query(Snap).filter(Snap.project_id == project_id, Snap.day < day).order_by(Snap.day.desc()).first()
+    if prev:
+        counts = {s.value: getattr(prev, s.value) for s in models.TaskStatus}
+    else:
+        counts = _task_counts(db, project_id)
+    # Another writer may open the same day concurrently; whichever insert lands first wins.
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    db.execute(dialect.insert(Snap).values(project_id=project_id, day=day, completed=0, **counts)
+               .on_conflict_do_nothing(index_elements=["project_id", "day"]))
+
+
+def _shift_snapshot(db: Session, project_id: Optional[int], day: date,
+                    from_status: Optional[models.TaskStatus], to_status: Optional[models.TaskStatus]) -> None:
+    if project_id is None:
+        return
+    Snap = models.ProjectDailySnapshot
+    values = {}
+    if from_status is not None:
+        values[from_status.value] = getattr(Snap, from_status.value) - 1
+    if to_status is not None:
+        values[to_status.value] = getattr(Snap, to_status.value) + 1
+        if to_status == models.TaskStatus.done:
+            values["completed"] = Snap.completed + 1
+    # Increment in SQL so concurrent writers do not overwrite each other's counts.
+    db.query(Snap).filter(Snap.project_id == project_id, Snap.day == day).update(values, synchronize_session=False)
+
+
+def _record_transition(db: Session, task: models.Task, from_status: Optional[models.TaskStatus],
+                       to_status: models.TaskStatus, now: datetime) -> None:
+    cycle_seconds = None
+    if to_status == models.TaskStatus.done and from_status is not None:
+        T = models.TaskTransition
+        started = (db.query(func.max(T.changed_at))
+                   .filter(T.task_id == task.id, T.to_status == models.TaskStatus.doing).scalar())
+        cycle_seconds = max(int((now - (started or task.created_at)).total_seconds()), 0)
+    db.add(models.TaskTransition(task_id=task.id, project_id=task.project_id, from_status=from_status,
+                                 to_status=to_status, changed_at=now, cycle_seconds=cycle_seconds))
+    _shift_snapshot(db, task.project_id, now.date(), from_status, to_status)
+
+
+def project_analytics(db: Session, pid: int, start: date, end: date) -> dict:
+    Snap = models.ProjectDailySnapshot
+    statuses = [s.value for s in models.TaskStatus]
+    baseline = db.query(Snap).filter(Snap.project_id == pid, Snap.day < start).order_by(Snap.day.desc()).first()
+    rows = {r.day: r for r in db.query(Snap).filter(Snap.project_id == pid, Snap.day.between(start, end))}
+    counts = {s: getattr(baseline, s) if baseline else 0 for s in statuses}
+    # No task of this project has been written through crud yet: today's counts are the stored tasks.
+    live = _task_counts(db, pid) if baseline is None and not rows else None
+    today = datetime.utcnow().date()
+
+    flow, burndown = [], []
+    for offset in range((end - start).days + 1):
+        day = start + timedelta(days=offset)
+        row = rows.get(day)
+        if row:
+            counts = {s: getattr(row, s) for s in statuses}
+        elif live is not None and day >= today:
+            counts = live
+        flow.append({"day": day, **counts, "completed": row.completed if row else 0})
+        burndown.append({"day": day, "remaining": counts["todo"] + counts["doing"]})
+
+    T = models.TaskTransition
+    done_q = db.query(T.cycle_seconds).filter(
+        T.project_id == pid,
+        T.to_status == models.TaskStatus.done,
+        T.changed_at >= datetime.combine(start, datetime.min.time()),
+        T.changed_at < datetime.combine(end + timedelta(days=1), datetime.min.time()),
+        T.cycle_seconds.isnot(None),
+    )
+    n = done_q.count()
+
+    def percentile(p: int) -> Optional[float]:
+        # Nearest-rank percentile, selected by the database instead of loading every sample.
+        if not n:
+            return None
+        rank = max(math.ceil(p / 100 * n), 1) - 1
+        seconds = done_q.order_by(T.cycle_seconds).offset(rank).limit(1).scalar()
+        return round(seconds / 3600, 2)
+
+    return {
+        "project_id": pid,
+        "start": start,
+        "end": end,
+        "cumulative_flow": flow,
+        "burndown": burndown,
+        "cycle_time": {"count": n, "p50_hours": percentile(50), "p85_hours": percentile(85),
+                       "p95_hours": percentile(95)},
+    }
@@ -1,6 +1,7 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from typing import Optional
 from .database import get_db
 from .security import verify_token
 from . import models
@@ -25,3 +26,23 @@ def require_role(*allowed_roles: models.Role):
         return user
 
     return guard
+
+
+def if_match_version(if_match: Optional[str] = Header(default=None)) -> Optional[int]:
+    """Parse an ``If-Match`` ETag into the version it names; ``*`` matches any.
+
+    Only a single strong tag (``"3"``) is supported. If-Match requires strong comparison,
+    so weak tags (``W/"3"``) and lists of tags are rejected with 400.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    tag = if_match.strip()
+    if tag.startswith("W/"):
+        raise HTTPException(status_code=400, detail="If-Match requires a strong ETag")
+    if not (len(tag) > 2 and tag[0] == tag[-1] == '"' and tag[1:-1].isdigit()):
+        raise HTTPException(status_code=400, detail="If-Match must be a single ETag")
+    return int(tag[1:-1])
+
+
+def etag(version: int) -> str:
+    return f'"{version}"'
@@ -1,9 +1,11 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import inspect, text
 from sqlalchemy.orm import Session
 from .config import settings
 from .database import Base, engine, SessionLocal
-from . import models
+from . import models, cache
+from .routers_admin import router as admin_router
 from .routers_auth import router as auth_router
 from .routers_projects import router as projects_router
 from .routers_tasks import router as tasks_router
@@ -18,11 +20,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 Base.metadata.create_all(bind=engine)
 
 
+def add_version_columns():
+    """create_all does not alter existing tables, so add the optimistic-locking column in place.
+
+    Every worker runs this at startup; on Postgres IF NOT EXISTS makes the concurrent ALTERs safe.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in ("projects", "tasks"):
+            if engine.dialect.name == "postgresql":
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1"))
+            elif "version" not in {c["name"] for c in inspector.get_columns(table)}:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+
+
+add_version_columns()
+
+
 def seed():
     db: Session = SessionLocal()
     try:
@@ -48,6 +68,7 @@ def seed():
                 models.Task(title="Push notifications", project_id=p2.id, owner_id=3, status=models.TaskStatus.todo),
             ])
             db.commit()
+            cache.invalidate("projects", "tasks", cache.task_scope(p1.id), cache.task_scope(p2.id))
     finally:
         db.close()
 
@@ -64,3 +85,4 @@ app.include_router(auth_router)
 app.include_router(projects_router)
 app.include_router(tasks_router)
 app.include_router(users_router)
+app.include_router(admin_router)
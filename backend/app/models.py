@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, Enum, Boolean, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -29,6 +29,7 @@ class Project(Base):
     name = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    version = Column(Integer, default=1, nullable=False)
     tasks = relationship("Task", back_populates="project", cascade="all,delete")
 
 
@@ -46,6 +47,38 @@ class Task(Base):
     project_id = Column(Integer, ForeignKey("projects.id"))
     owner_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
+    version = Column(Integer, default=1, nullable=False)
 
     project = relationship("Project", back_populates="tasks")
     owner = relationship("User", back_populates="tasks")
+
+
+class TaskTransition(Base):
+    """Append-only log of task status changes; from_status is None on creation."""
+    __tablename__ = "task_transitions"
+    id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(Integer, index=True, nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    from_status = Column(Enum(TaskStatus), nullable=True)
+    to_status = Column(Enum(TaskStatus), nullable=False)
+    changed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Filled on transitions into "done": seconds since the task last entered "doing" (or was created).
+    cycle_seconds = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_task_transitions_project_to_changed", "project_id", "to_status", "changed_at"),
+    )
+
+
+class ProjectDailySnapshot(Base):
+    """End-of-day task counts per status for a project, updated incrementally on every transition.
+
+    Days without transitions have no row; their counts equal the closest earlier row.
+    """
+    __tablename__ = "project_daily_snapshots"
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    todo = Column(Integer, default=0, nullable=False)
+    doing = Column(Integer, default=0, nullable=False)
+    done = Column(Integer, default=0, nullable=False)
+    completed = Column(Integer, default=0, nullable=False)
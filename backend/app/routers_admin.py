@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Depends
+
+from . import schemas, models, cache
+from .deps import require_role
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/cache", response_model=schemas.CacheStats, dependencies=[Depends(require_role(models.Role.admin))])
+def cache_stats():
+    return cache.stats()
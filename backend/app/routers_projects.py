@@ -1,32 +1,64 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import date, datetime, timedelta
 from .database import get_db
-from . import schemas, crud, models
-from .deps import require_role, get_current_user
+from . import schemas, crud, models, cache
+from .deps import require_role, get_current_user, if_match_version, etag
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
+MAX_ANALYTICS_DAYS = 366
+_project_list = TypeAdapter(List[schemas.ProjectOut])
+
 
 @router.get("/", response_model=List[schemas.ProjectOut])
 def list_projects(q: Optional[str] = None, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    return crud.list_projects(db, q=q)
+    body = cache.get_or_set("projects.list", {"q": q}, user.role.value, ["projects"],
+                            lambda: _project_list.dump_json(
+                                _project_list.validate_python(crud.list_projects(db, q=q), from_attributes=True)))
+    return Response(content=body, media_type="application/json")
 
 
 @router.post("/", response_model=schemas.ProjectOut,
              dependencies=[Depends(require_role(models.Role.manager, models.Role.admin))])
-def create_project(data: schemas.ProjectCreate, db: Session = Depends(get_db)):
-    return crud.create_project(db, data)
+def create_project(data: schemas.ProjectCreate, response: Response, db: Session = Depends(get_db)):
+    obj = crud.create_project(db, data)
+    response.headers["ETag"] = etag(obj.version)
+    return obj
 
 
 @router.put("/{pid}", response_model=schemas.ProjectOut,
             dependencies=[Depends(require_role(models.Role.manager, models.Role.admin))])
-def update_project(pid: int, data: schemas.ProjectUpdate, db: Session = Depends(get_db)):
-    obj = crud.update_project(db, pid, data)
+def update_project(pid: int, data: schemas.ProjectUpdate, response: Response, db: Session = Depends(get_db),
+                   expected: Optional[int] = Depends(if_match_version)):
+    if expected is not None:
+        if data.version is not None and data.version != expected:
+            raise HTTPException(400, "If-Match does not match version")
+        data = data.model_copy(update={"version": expected})
+    try:
+        obj = crud.update_project(db, pid, data)
+    except crud.VersionConflict:
+        raise HTTPException(409, "Project was modified by someone else")
     if not obj: raise HTTPException(404, "Project not found")
+    response.headers["ETag"] = etag(obj.version)
     return obj
 
 
+@router.get("/{pid}/analytics", response_model=schemas.ProjectAnalytics,
+            dependencies=[Depends(require_role(models.Role.manager, models.Role.admin))])
+def project_analytics(pid: int, start: Optional[date] = None, end: Optional[date] = None,
+                      db: Session = Depends(get_db)):
+    if not db.query(models.Project).get(pid): raise HTTPException(404, "Project not found")
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    if start > end: raise HTTPException(400, "start must not be after end")
+    if (end - start).days >= MAX_ANALYTICS_DAYS:
+        raise HTTPException(400, f"Date range is limited to {MAX_ANALYTICS_DAYS} days")
+    return crud.project_analytics(db, pid, start, end)
+
+
 @router.delete("/{pid}", dependencies=[Depends(require_role(models.Role.admin))])
 def delete_project(pid: int, db: Session = Depends(get_db)):
     ok = crud.delete_project(db, pid)
@@ -1,30 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from .database import get_db
-from . import schemas, crud, models
-from .deps import require_role, get_current_user
+from . import schemas, crud, models, cache
+from .deps import require_role, get_current_user, if_match_version, etag
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
+_task_list = TypeAdapter(List[schemas.TaskOut])
+
 
 @router.get("/", response_model=List[schemas.TaskOut])
 def list_tasks(status: Optional[models.TaskStatus] = None, project_id: Optional[int] = None,
                db: Session = Depends(get_db), user=Depends(get_current_user)):
-    return crud.list_tasks(db, status=status, project_id=project_id)
+    body = cache.get_or_set("tasks.list", {"status": status, "project_id": project_id}, user.role.value,
+                            [cache.task_scope(project_id)],
+                            lambda: _task_list.dump_json(_task_list.validate_python(
+                                crud.list_tasks(db, status=status, project_id=project_id), from_attributes=True)))
+    return Response(content=body, media_type="application/json")
 
 
 @router.post("/", response_model=schemas.TaskOut,
              dependencies=[Depends(require_role(models.Role.user, models.Role.manager, models.Role.admin))])
-def create_task(data: schemas.TaskCreate, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    return crud.create_task(db, owner_id=user.id, data=data)
+def create_task(data: schemas.TaskCreate, response: Response, db: Session = Depends(get_db),
+                user=Depends(get_current_user)):
+    obj = crud.create_task(db, owner_id=user.id, data=data)
+    response.headers["ETag"] = etag(obj.version)
+    return obj
 
 
 @router.put("/{tid}", response_model=schemas.TaskOut,
             dependencies=[Depends(require_role(models.Role.user, models.Role.manager, models.Role.admin))])
-def update_task(tid: int, data: schemas.TaskUpdate, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    obj = crud.update_task(db, tid, data)
+def update_task(tid: int, data: schemas.TaskUpdate, response: Response, db: Session = Depends(get_db),
+                user=Depends(get_current_user), expected: Optional[int] = Depends(if_match_version)):
+    if expected is not None:
+        if data.version is not None and data.version != expected:
+            raise HTTPException(400, "If-Match does not match version")
+        data = data.model_copy(update={"version": expected})
+    try:
+        obj = crud.update_task(db, tid, data)
+    except crud.VersionConflict:
+        raise HTTPException(409, "Task was modified by someone else")
     if not obj: raise HTTPException(404, "Task not found")
+    response.headers["ETag"] = etag(obj.version)
     return obj
 
 
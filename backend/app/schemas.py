@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field, field_validator
-from typing import Optional
-from datetime import datetime
+from typing import List, Optional
+from datetime import date, datetime
 from .models import Role, TaskStatus
 import re
 
@@ -83,12 +83,13 @@ class ProjectCreate(ProjectBase):
 
 
 class ProjectUpdate(ProjectBase):
-    pass
+    version: Optional[int] = None
 
 
 class ProjectOut(ProjectBase):
     id: int
     created_at: datetime
+    version: int
 
     class Config:
         from_attributes = True
@@ -107,12 +108,61 @@ class TaskCreate(TaskBase):
 class TaskUpdate(BaseModel):
     title: Optional[str] = Field(default=None, min_length=2, max_length=255)
     status: Optional[TaskStatus] = None
+    version: Optional[int] = None
 
 
 class TaskOut(TaskBase):
     id: int
     created_at: datetime
     owner_id: int
+    version: int
 
     class Config:
         from_attributes = True
+
+
+# ---- Analytics ----
+class FlowPoint(BaseModel):
+    day: date
+    todo: int
+    doing: int
+    done: int
+    completed: int
+
+
+class BurndownPoint(BaseModel):
+    day: date
+    remaining: int
+
+
+class CycleTimeStats(BaseModel):
+    count: int
+    p50_hours: Optional[float] = None
+    p85_hours: Optional[float] = None
+    p95_hours: Optional[float] = None
+
+
+class ProjectAnalytics(BaseModel):
+    project_id: int
+    start: date
+    end: date
+    cumulative_flow: List[FlowPoint]
+    burndown: List[BurndownPoint]
+    cycle_time: CycleTimeStats
+
+
+# ---- Admin ----
+class CacheRouteStats(BaseModel):
+    route: str
+    enabled: bool
+    hits: int
+    misses: int
+    hit_ratio: float
+
+
+class CacheStats(BaseModel):
+    enabled: bool
+    available: bool
+    entries: int
+    bytes: int
+    routes: List[CacheRouteStats]
@@ -0,0 +1,99 @@
+import sqlite3
+
+from .test_utils import client, auth
+from . import cache
+from .config import settings
+
+
+def _renderer(body: bytes):
+    calls = []
+
+    def render():
+        calls.append(body)
+        return body
+
+    return render, calls
+
+
+def test_disabled_route_bypasses_cache(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_DISABLED_ROUTES", "off.list")
+    off, off_calls = _renderer(b"off")
+    on, on_calls = _renderer(b"on")
+    for _ in range(3):
+        assert cache.get_or_set("off.list", {}, "user", ["projects"], off) == b"off"
+        assert cache.get_or_set("on.list", {}, "user", ["projects"], on) == b"on"
+    assert len(off_calls) == 3
+    assert len(on_calls) == 1
+
+    routes = {r["route"]: r for r in cache.stats()["routes"]}
+    assert "off.list" not in routes
+    assert (routes["on.list"]["hits"], routes["on.list"]["misses"]) == (2, 1)
+
+
+def test_lru_evicts_least_recently_used_beyond_byte_budget(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_MAX_BYTES", 250)
+    monkeypatch.setattr(cache, "TOUCH_SECONDS", 0)
+    renders = {name: _renderer(name.encode() * 100) for name in ("a", "b", "c")}
+
+    def get(name):
+        return cache.get_or_set(f"lru.{name}", {}, "user", ["lru"], renders[name][0])
+
+    get("a")
+    get("b")
+    get("a")  # a is now more recently used than b
+    get("c")
+    assert cache.stats()["bytes"] <= 250
+
+    get("a")
+    assert len(renders["a"][1]) == 1
+    get("b")
+    assert len(renders["b"][1]) == 2
+
+
+def _task_list_hits():
+    return next((r["hits"] for r in cache.stats()["routes"] if r["route"] == "tasks.list"), 0)
+
+
+def test_task_write_only_invalidates_its_own_project():
+    h_mgr = auth("manager@example.com", "Manager123!")
+    p1 = client.post("/projects/", json={"name": "Board one"}, headers=h_mgr).json()["id"]
+    p2 = client.post("/projects/", json={"name": "Board two"}, headers=h_mgr).json()["id"]
+    client.post("/tasks/", json={"title": "Other board", "project_id": p2}, headers=h_mgr)
+    client.get(f"/tasks/?project_id={p1}", headers=h_mgr)
+    client.get(f"/tasks/?project_id={p2}", headers=h_mgr)
+    client.get("/tasks/", headers=h_mgr)
+
+    client.post("/tasks/", json={"title": "New on one", "project_id": p1}, headers=h_mgr)
+    hits = _task_list_hits()
+    assert len(client.get(f"/tasks/?project_id={p2}", headers=h_mgr).json()) == 1
+    assert _task_list_hits() == hits + 1
+
+    assert [t["title"] for t in client.get(f"/tasks/?project_id={p1}", headers=h_mgr).json()] == ["New on one"]
+    assert any(t["title"] == "New on one" for t in client.get("/tasks/", headers=h_mgr).json())
+    assert _task_list_hits() == hits + 1
+
+
+def test_delete_project_invalidates_task_listing():
+    h_admin = auth("admin@example.com", "Admin123!")
+    pid = client.post("/projects/", json={"name": "Doomed"}, headers=h_admin).json()["id"]
+    client.post("/tasks/", json={"title": "Doomed task", "project_id": pid}, headers=h_admin)
+    assert len(client.get(f"/tasks/?project_id={pid}", headers=h_admin).json()) == 1
+    assert len(client.get(f"/tasks/?project_id={pid}", headers=h_admin).json()) == 1
+
+    assert client.delete(f"/projects/{pid}", headers=h_admin).status_code == 200
+    assert client.get(f"/tasks/?project_id={pid}", headers=h_admin).json() == []
+
+
+def test_locked_cache_does_not_fail_writes():
+    conn = cache._conn()
+    conn.execute("PRAGMA busy_timeout = 50")
+    locker = sqlite3.connect(settings.CACHE_PATH, isolation_level=None)
+    locker.execute("BEGIN IMMEDIATE")
+    try:
+        cache.invalidate("projects")
+        assert cache.stats()["available"] is False
+    finally:
+        locker.execute("ROLLBACK")
+        locker.close()
+        conn.execute("PRAGMA busy_timeout = 5000")
+    assert cache.stats()["available"] is True
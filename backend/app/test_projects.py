@@ -1,4 +1,7 @@
 from .test_utils import client, auth
+from .database import SessionLocal
+from . import models, crud
+from .config import settings
 
 
 def test_list_projects_requires_auth():
@@ -15,3 +18,121 @@ def test_create_project_manager_only():
     r2 = client.post("/projects/", json={"name": "Demo", "description": "ZZ"}, headers=h_mgr)
     assert r2.status_code == 200
     assert r2.json()["name"] == "Demo"
+
+
+def test_project_analytics_from_transitions():
+    h_mgr = auth("manager@example.com", "Manager123!")
+    pid = client.post("/projects/", json={"name": "Analytics", "description": "flow"}, headers=h_mgr).json()["id"]
+    ids = [client.post("/tasks/", json={"title": f"T{i}", "project_id": pid}, headers=h_mgr).json()["id"]
+           for i in range(3)]
+    client.put(f"/tasks/{ids[0]}", json={"status": "doing"}, headers=h_mgr)
+    client.put(f"/tasks/{ids[0]}", json={"status": "done"}, headers=h_mgr)
+    client.put(f"/tasks/{ids[1]}", json={"status": "doing"}, headers=h_mgr)
+    client.delete(f"/tasks/{ids[2]}", headers=h_mgr)
+
+    h_user = auth("user@example.com", "User123!")
+    assert client.get(f"/projects/{pid}/analytics", headers=h_user).status_code == 403
+
+    r = client.get(f"/projects/{pid}/analytics", headers=h_mgr)
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert len(data["cumulative_flow"]) == 30
+    today = data["cumulative_flow"][-1]
+    assert (today["todo"], today["doing"], today["done"], today["completed"]) == (0, 1, 1, 1)
+    assert data["burndown"][-1]["remaining"] == 1
+    assert data["cycle_time"]["count"] == 1
+    assert data["cycle_time"]["p50_hours"] == 0
+
+    bad = client.get(f"/projects/{pid}/analytics?start=2025-02-01&end=2025-01-01", headers=h_mgr)
+    assert bad.status_code == 400
+
+    h_admin = auth("admin@example.com", "Admin123!")
+    assert client.delete(f"/projects/{pid}", headers=h_admin).status_code == 200
+    db = SessionLocal()
+    try:
+        assert db.query(models.TaskTransition).filter_by(project_id=pid).count() == 0
+        assert db.query(models.ProjectDailySnapshot).filter_by(project_id=pid).count() == 0
+    finally:
+        db.close()
+
+
+def test_project_list_cache_hits_and_invalidation():
+    h_admin = auth("admin@example.com", "Admin123!")
+    before = client.get("/projects/?q=cached", headers=h_admin)
+    again = client.get("/projects/?q=cached", headers=h_admin)
+    assert before.status_code == again.status_code == 200
+    assert before.json() == again.json()
+
+    created = client.post("/projects/", json={"name": "Cached project"}, headers=h_admin).json()
+    after = client.get("/projects/?q=cached", headers=h_admin).json()
+    assert any(p["id"] == created["id"] for p in after)
+
+    h_mgr = auth("manager@example.com", "Manager123!")
+    assert client.get("/admin/cache", headers=h_mgr).status_code == 403
+
+    stats = client.get("/admin/cache", headers=h_admin)
+    assert stats.status_code == 200
+    route = next(r for r in stats.json()["routes"] if r["route"] == "projects.list")
+    assert route["hits"] >= 1 and route["misses"] >= 2
+    assert 0 < route["hit_ratio"] < 1
+
+
+def test_project_analytics_without_snapshots_uses_current_tasks():
+    h_mgr = auth("manager@example.com", "Manager123!")
+    pid = client.post("/projects/", json={"name": "Untouched"}, headers=h_mgr).json()["id"]
+    db = SessionLocal()
+    try:
+        db.add_all([models.Task(title="Seeded todo", project_id=pid, owner_id=1),
+                    models.Task(title="Seeded doing", project_id=pid, owner_id=1, status=models.TaskStatus.doing)])
+        db.commit()
+    finally:
+        db.close()
+
+    data = client.get(f"/projects/{pid}/analytics", headers=h_mgr).json()
+    today = data["cumulative_flow"][-1]
+    assert (today["todo"], today["doing"], today["done"]) == (1, 1, 0)
+    assert data["burndown"][-1]["remaining"] == 2
+    assert data["cumulative_flow"][0]["todo"] == 0
+
+
+def test_update_project_version_conflict():
+    h_mgr = auth("manager@example.com", "Manager123!")
+    r = client.post("/projects/", json={"name": "Versioned project"}, headers=h_mgr)
+    project = r.json()
+    assert project["version"] == 1 and r.headers["ETag"] == '"1"'
+
+    ok = client.put(f"/projects/{project['id']}", json={"name": "Versioned 2", "version": 1}, headers=h_mgr)
+    assert ok.status_code == 200
+    assert ok.json()["version"] == 2 and ok.headers["ETag"] == '"2"'
+
+    ok = client.put(f"/projects/{project['id']}", json={"name": "Versioned 3"}, headers={**h_mgr, "If-Match": '"2"'})
+    assert ok.status_code == 200 and ok.json()["version"] == 3
+
+    stale = client.put(f"/projects/{project['id']}", json={"name": "Stale", "version": 1}, headers=h_mgr)
+    assert stale.status_code == 409
+    stale = client.put(f"/projects/{project['id']}", json={"name": "Stale"}, headers={**h_mgr, "If-Match": '"1"'})
+    assert stale.status_code == 409
+
+    mismatch = client.put(f"/projects/{project['id']}", json={"name": "Mismatch", "version": 3},
+                          headers={**h_mgr, "If-Match": '"2"'})
+    assert mismatch.status_code == 400
+
+    blind = client.put(f"/projects/{project['id']}", json={"name": "Blind"}, headers=h_mgr)
+    assert blind.status_code == 200 and blind.json()["version"] == 4
+    assert client.put("/projects/999999", json={"name": "Missing"}, headers=h_mgr).status_code == 404
+
+
+def test_project_list_serializes_unloaded_attributes(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_DISABLED_ROUTES", "projects.list")
+    list_projects = crud.list_projects
+
+    def expired(db, q=None):
+        rows = list_projects(db, q=q)
+        for p in rows:
+            db.expire(p, ["description"])
+        return rows
+
+    monkeypatch.setattr(crud, "list_projects", expired)
+    h_user = auth("user@example.com", "User123!")
+    projects = client.get("/projects/", headers=h_user).json()
+    assert projects and all("description" in p for p in projects)
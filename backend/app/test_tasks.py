@@ -1,4 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import threading
+
+import pytest
+
 from .test_utils import client, auth
+from .database import SessionLocal
+from . import crud, models, schemas
 
 
 def test_crud_tasks():
@@ -14,3 +22,125 @@ def test_crud_tasks():
     r3 = client.put(f"/tasks/{tid}", json={"status": "doing"}, headers=h_user)
     assert r3.status_code == 200
     assert r3.json()["status"] == "doing"
+
+
+def test_update_task_version_conflict():
+    h_user = auth("user@example.com", "User123!")
+    r = client.post("/tasks/", json={"title": "Versioned", "project_id": 1}, headers=h_user)
+    task = r.json()
+    assert task["version"] == 1 and r.headers["ETag"] == '"1"'
+
+    ok = client.put(f"/tasks/{task['id']}", json={"title": "Versioned 2"}, headers={**h_user, "If-Match": '"1"'})
+    assert ok.status_code == 200
+    assert ok.json()["version"] == 2 and ok.headers["ETag"] == '"2"'
+
+    stale = client.put(f"/tasks/{task['id']}", json={"title": "Stale", "version": 1}, headers=h_user)
+    assert stale.status_code == 409
+
+    bad = client.put(f"/tasks/{task['id']}", json={"title": "Bad"}, headers={**h_user, "If-Match": "nope"})
+    assert bad.status_code == 400
+
+    for header in ('W/"2"', '"2", "3"'):
+        r = client.put(f"/tasks/{task['id']}", json={"title": "Bad"}, headers={**h_user, "If-Match": header})
+        assert r.status_code == 400, header
+
+
+def test_concurrent_blind_updates_all_succeed():
+    h_user = auth("user@example.com", "User123!")
+    tid = client.post("/tasks/", json={"title": "Blind task", "project_id": 1}, headers=h_user).json()["id"]
+
+    def put(i):
+        status = "doing" if i % 2 else "todo"
+        return client.put(f"/tasks/{tid}", json={"title": f"blind-{i}", "status": status}, headers=h_user).status_code
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        codes = list(pool.map(put, range(200)))
+
+    assert codes == [200] * 200
+    tasks = client.get("/tasks/?project_id=1", headers=h_user).json()
+    assert next(t for t in tasks if t["id"] == tid)["version"] == 1 + 200
+
+    # Every retry re-read the status it replaced, so the daily snapshot still matches the tasks.
+    h_mgr = auth("manager@example.com", "Manager123!")
+    today = client.get("/projects/1/analytics", headers=h_mgr).json()["cumulative_flow"][-1]
+    assert [today[s] for s in ("todo", "doing", "done")] == \
+           [sum(t["status"] == s for t in tasks) for s in ("todo", "doing", "done")]
+
+
+def test_concurrent_task_updates_do_not_lose_writes():
+    h_user = auth("user@example.com", "User123!")
+    tid = client.post("/tasks/", json={"title": "Hot task", "project_id": 1}, headers=h_user).json()["id"]
+
+    def bump(worker):
+        conflicts, written = 0, []
+        while len(written) < 3:
+            current = next(t for t in client.get("/tasks/?project_id=1", headers=h_user).json() if t["id"] == tid)
+            title = f"w{worker}-{len(written)}"
+            r = client.put(f"/tasks/{tid}", json={"title": title, "version": current["version"]}, headers=h_user)
+            assert r.status_code in (200, 409), r.text
+            if r.status_code == 200:
+                written.append((r.json()["version"], title))
+            else:
+                conflicts += 1
+        return conflicts, written
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(bump, range(8)))
+
+    assert sum(conflicts for conflicts, _ in results) > 0
+    written = dict(w for _, ws in results for w in ws)
+    assert sorted(written) == list(range(2, 2 + 8 * 3))
+
+    final = next(t for t in client.get("/tasks/?project_id=1", headers=h_user).json() if t["id"] == tid)
+    assert final["version"] == 1 + 8 * 3
+    assert final["title"] == written[final["version"]]
+
+
+def test_versioned_update_rejects_stale_version():
+    h_user = auth("user@example.com", "User123!")
+    task = client.post("/tasks/", json={"title": "Guarded", "project_id": 1}, headers=h_user).json()
+    client.put(f"/tasks/{task['id']}", json={"title": "Moved on"}, headers=h_user)
+
+    # Bypasses update_task's early check so only the conditional UPDATE can catch it.
+    db = SessionLocal()
+    try:
+        with pytest.raises(crud.VersionConflict):
+            crud._versioned_update(db, models.Task, task["id"], task["version"], {"title": "Lost update"})
+    finally:
+        db.close()
+    current = next(t for t in client.get("/tasks/?project_id=1", headers=h_user).json() if t["id"] == task["id"])
+    assert current["title"] == "Moved on"
+
+
+def test_first_transitions_of_the_day_race_on_snapshot():
+    h_mgr = auth("manager@example.com", "Manager123!")
+    pid = client.post("/projects/", json={"name": "Snapshot race"}, headers=h_mgr).json()["id"]
+    db = SessionLocal()
+    try:
+        # Stored without crud, so no snapshot row exists yet and every worker tries to open it.
+        tasks = [models.Task(title=f"Race {i}", project_id=pid, owner_id=1) for i in range(8)]
+        db.add_all(tasks)
+        db.commit()
+        tids = [t.id for t in tasks]
+    finally:
+        db.close()
+
+    barrier = threading.Barrier(len(tids))
+
+    def move(tid):
+        session = SessionLocal()
+        try:
+            barrier.wait()
+            return crud.update_task(session, tid, schemas.TaskUpdate(status=models.TaskStatus.doing)).status
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=len(tids)) as pool:
+        assert list(pool.map(move, tids)) == [models.TaskStatus.doing] * len(tids)
+
+    db = SessionLocal()
+    try:
+        snap = db.query(models.ProjectDailySnapshot).get((pid, datetime.utcnow().date()))
+        assert (snap.todo, snap.doing, snap.done) == (0, len(tids), 0)
+    finally:
+        db.close()
@@ -1,3 +1,9 @@
+import os
+import tempfile
+
+# Keep the shared response cache out of the working tree and fresh for every run.
+os.environ.setdefault("CACHE_PATH", os.path.join(tempfile.mkdtemp(), "response_cache.db"))
+
 from fastapi.testclient import TestClient
 from .main import app
 